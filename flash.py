@@ -2,165 +2,158 @@ import typing as t
 import click
 import math
 import random
-from numpy import dot
+import numpy as np
 from drawSvg import Drawing, Path
-
-
-def angle_between(v1, v2):
-    u = v1.normal_form
-    v = v2.normal_form
-    try:
-        return math.acos(dot(u, v) / dot(v1.length, v2.length))
-    except ValueError:
-        print("value error: {0!r} {1!r}".format(u, v))
-        return math.pi
-
-
-class Point:
-    def __init__(self, x=0.0, y=0.0):
-        self._point = (x, y)
-
-    def __repr__(self):
-        return "<{0}, {1}>".format(self.x, self.y)
-
-    @property
-    def x(self):
-        return self._point[0]
-
-    @x.setter
-    def x(self, value):
-        self._point[0] = value
-
-    @property
-    def y(self):
-        return self._point[1]
-
-    @y.setter
-    def y(self, value):
-        self._point[1] = value
-
-    def translate(self, x, y):
-        return Point(self.x + x, self.y + y)
-
-    def within_limits(self, x, y):
-        return self.x >= 0 and self.x <= x and self.y >= 0 and self.y <= y
-
-    def within_perimeter(self, other, r):
-        return Vector(self, other).length < r
-
-
-class Vector:
-    _vector: t.Tuple[Point, Point]
-
-    def __init__(self, a: Point, b: Point):
-        if not isinstance(a, Point):
-            raise TypeError("a must be Point")
-        elif not isinstance(b, Point):
-            raise TypeError("b must be Point")
+from geometry import Point, Vector, angle_between  # noqa: F401
+
+# default node buffer size of a Flash
+CAPACITY = 16
+
+
+def _walk(
+    xs,
+    ys,
+    n,
+    end_x,
+    end_y,
+    width,
+    height,
+    length,
+    data,
+    mix,
+    alternate,
+    deflect,
+    factor,
+):
+    """
+    Write the next node of a zig-zag walk towards the end point into the
+    coordinate buffers at n, return the new node count.
+    A step that would leave the canvas is mirrored back at the border.
+    """
+    if length == 0.0:
+        length = float(np.random.randint(1, 11))
+    cx = xs[n - 1]
+    cy = ys[n - 1]
+    if n < 2:
+        dx = float(np.random.randint(1, 11) - 5)
+        dy = float(np.random.randint(1, 11) - 5)
+    else:
+        deflector = deflect * (1.0 - mix) + data * mix
+        if alternate:
+            # every other node heads for the end point, starting with the second
+            factor *= 1 - (n & 1)
+
+        half_pi = math.pi / 2
+        if factor == 0:
+            # why is it off?
+            phi = math.atan2(end_x - cx, end_y - cy)
+            new_angle = half_pi - phi + (deflector - 0.5)
+            step = length * length
         else:
-            self._vector = (a, b)
+            new_angle = half_pi - factor * deflector * half_pi
+            step = length
 
-    def __repr__(self) -> str:
-        return f"<Vector {self.a}, {self.b}>"
+        dx = step * math.cos(new_angle)
+        dy = step * math.sin(new_angle)
 
-    @staticmethod
-    def from_polar(start, phi, length) -> "Vector":
-        end = Point(
-            start.x + length * math.cos(phi),
-            start.y + length * math.sin(phi),
-        )
-        return Vector(start, end)
+    if not 0 <= cx + dx <= width:
+        dx = -dx
+    if not 0 <= cy + dy <= height:
+        dy = -dy
+    # steps longer than the canvas still overshoot after mirroring
+    xs[n] = min(max(cx + dx, 0.0), width)
+    ys[n] = min(max(cy + dy, 0.0), height)
+    return n + 1
 
-    @property
-    def normal_form(self) -> t.Tuple:
-        """
-        B - A, assume 0, 0 origin
-        """
-        return (self.a.x - self.b.x, self.a.y - self.b.y)
 
-    @property
-    def a(self) -> Point:
-        return self._vector[0]
+def _seed(value):
+    np.random.seed(value)
 
-    @a.setter
-    def a(self, value: Point):
-        self._vector = (value, self._vector[1])
 
-    @property
-    def b(self) -> Point:
-        return self._vector[1]
+def enable_jit():
+    """
+    Compile the walk kernels with numba. Importing numba takes about half a
+    second and saves about a microsecond per step, so this only pays off
+    for walks of several hundred thousand steps. Call it before seed(),
+    numba keeps its own random state.
+    """
+    global _walk, _seed
+    from numba import njit
 
-    @b.setter
-    def b(self, value: Point):
-        self._vector = (self._vector[0], value)
+    _walk = njit(cache=True)(_walk)
+    _seed = njit(cache=True)(_seed)
 
-    @property
-    def ab(self):
-        return self.b.x - self.a.x, self.b.y - self.a.y
 
-    @property
-    def length(self):
-        ab = self.ab
-        return math.sqrt(ab[0] ** 2 + ab[1] ** 2)
+def seed(value: int):
+    """
+    Seed both the python and the (jitted) numpy random generators
+    """
+    random.seed(value)
+    np.random.seed(value)
+    _seed(value)
 
-    @property
-    def heading(self):
-        ab = self.ab
-        length = self.length
-        return ab[0] / length, ab[1] / length
 
-    @property
-    def phi(self):
-        x, y = self.heading
-        return math.atan2(x, y)
-
-    def dot(self, v):
-        return self.ab[0] * v.ab[0] + self.ab[1] * v.ab[1]
+def _line_to(path, xs, ys):
+    """
+    Append a line command per coordinate pair to path in one call,
+    flipping y the same way Path.L does
+    """
+    if len(xs):
+        path.append(" ".join(map("L{},{}".format, xs.tolist(), (-ys).tolist())))
 
 
 class Flash:
-    __alternate = 0
-
-    def __init__(self, width=500, height=500, start=None, end=None):
+    def __init__(
+        self, width=500, height=500, start=None, end=None, nodes_hint=CAPACITY
+    ):
         self.width = width
         self.height = height
         self.start = start or Point(width // 2, height)
         self.end = end or Point(width // 2, 0)
-        self._nodes: t.List[Point] = []
-        self._nodes.append(self.start)
+        # node coordinates as parallel buffers, grown by doubling
+        self.xs = np.empty(max(nodes_hint, 1), np.float64)
+        self.ys = np.empty(max(nodes_hint, 1), np.float64)
+        self._n = 0
+        self._edges = None
+        self.add_node(self.start)
 
     def __str__(self):
-        return " → ".join(map(str, self._nodes))
+        return " → ".join(map(str, self.points))
 
     def __repr__(self):
         return "<Flash {}>".format(id(self))
 
     def __len__(self):
-        return len(self._nodes)
+        return self._n
 
     @property
-    def current_node(self):
-        return self._nodes[-1:][0]
+    def current_node(self) -> Point:
+        return self.current_point()
 
     @property
-    def random_node(self):
-        return self._nodes[random.randint(0, len(self._nodes) - 1)]
+    def random_node(self) -> Point:
+        i = random.randint(0, self._n - 1)
+        return Point(float(self.xs[i]), float(self.ys[i]))
 
-    def current_point(self):
-        return self.points[-1:][0]
+    def current_point(self) -> Point:
+        return Point(float(self.xs[self._n - 1]), float(self.ys[self._n - 1]))
 
-    def random_point(self, x=10, y=10):
+    def random_point(self, x: int = 10, y: int = 10) -> Point:
         current = self.current_point()
         return Point(
             current.x + random.randint(1, x) - x // 2,
             current.y + random.randint(1, y) - y // 2,
         )
 
-    def alternate(self, a, b):
-        self.__alternate = 1 if self.__alternate == 0 else 0
-        return a if self.__alternate == 0 else b
-
-    def random_walk(self, length=None, data=0.0, mix=0.0, alternate=False):
+    def random_walk(
+        self,
+        length=None,
+        data=0.0,
+        mix=0.0,
+        alternate=False,
+        deflect=None,
+        factor=None,
+    ):
         """
         Create a segment in a zig-zag path towards the end point
         :param number:
@@ -169,63 +162,71 @@ class Flash:
             range -1..1 fixed influence on the deflector
         :param float:
             range 0..1 how to mix fixed with random value
+        :param float:
+            range 0..1 random part of the deflector, drawn if not given
+        :param int:
+            -1, 0 or 1 direction of the deflection, drawn if not given
         """
+        if deflect is None:
+            deflect = np.random.random()
+        if factor is None:
+            factor = np.random.randint(-1, 2)
+        self._reserve(1)
+        self._n = _walk(
+            self.xs,
+            self.ys,
+            self._n,
+            float(self.end.x),
+            float(self.end.y),
+            float(self.width),
+            float(self.height),
+            float(length or 0),
+            float(data),
+            float(mix),
+            alternate,
+            float(deflect),
+            int(factor),
+        )
+        self._edges = None
 
-        def next_node(length):
-            try:
-                a, b = self.points[-2:]
-            except ValueError:
-                return self.random_point(10, 10)
-
-            deflect = random.random() * (1.0 - mix) + data * mix
-
-            factor = (
-                self.alternate(0, random.randint(-1, 1))
-                if alternate
-                else random.randint(-1, 1)
-            )
+    def _reserve(self, count):
+        if self._n + count > len(self.xs):
+            size = max(2 * len(self.xs), self._n + count)
+            self.xs = np.resize(self.xs, size)
+            self.ys = np.resize(self.ys, size)
 
-            if factor == 0:
-                # why is it off?
-                new_angle = math.pi / 2 - Vector(b, self.end).phi + (deflect - 0.5)
-                length = length**2
-            else:
-                new_angle = math.pi / 2 - factor * deflect * math.pi / 2
-
-            nv = Vector.from_polar(b, new_angle, length)
-            return b.translate(*nv.ab)
-
-        length = length or random.randint(1, 10)
-        node = next_node(length)
-        retry = 10
-        while not node.within_limits(self.width, self.height):
-            node = next_node(length)
-            retry -= 1
-            # safety catch against infinite looping
-            if retry == 0:
-                node = self.random_point()
-                break
-        self.add_node(node)
+    def _append(self, x, y):
+        self._reserve(1)
+        self.xs[self._n] = x
+        self.ys[self._n] = y
+        self._n += 1
+        self._edges = None
 
     def add_node(self, node=None):
         if node is None:
             node = self.random_point()
-        self._nodes.append(node)
-
-    @property
-    def flashes(self):
-        return [n for n in self._nodes if isinstance(n, Flash)]
+        self._append(node.x, node.y)
 
     @property
-    def points(self):
-        return [n for n in self._nodes if isinstance(n, Point)]
+    def points(self) -> t.List[Point]:
+        xs = self.xs[: self._n].tolist()
+        ys = self.ys[: self._n].tolist()
+        return [Point(x, y) for x, y in zip(xs, ys)]
 
     @property
-    def edges(self):
-        return [Vector(self.points[i], p) for i, p in enumerate(self.points[1:])]
+    def edges(self) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Edge deltas and lengths as (dx, dy, length) arrays, cached until
+        the next node is added
+        """
+        if self._edges is None:
+            dx = np.diff(self.xs[: self._n])
+            dy = np.diff(self.ys[: self._n])
+            self._edges = (dx, dy, np.hypot(dx, dy))
+        return self._edges
 
     @property
-    def path(self):
+    def path(self) -> Path:
         path = Path(
             stroke_width=1,
             stroke="black",
@@ -234,8 +235,7 @@ class Flash:
             stroke_miterlimit=25,  # keep it pointy
         )
         path.M(self.start.x, self.start.y)
-        for node in self.points[1:]:
-            path.L(node.x, node.y)
+        _line_to(path, self.xs[1 : self._n], self.ys[1 : self._n])
 
         return path
 
@@ -252,22 +252,26 @@ class Flash:
         )
         path.M(self.start.x, self.start.y)
 
-        for node in self.points[1:]:
-            path.L(node.x, node.y)
-
-        backflash = []
-        for i, v1 in enumerate(self.edges):
-            lp = len(self.points)
-            if i < lp - 2:
-                v2 = self.edges[i + 1]
-                assert v1.b == v2.a
-                phi = angle_between(v1, v2)
-                distance = thickness - (thickness / (i + 1))
-                point = Vector.from_polar(v1.b, phi, distance)
-                backflash.append(point)
-
-        for p in reversed(backflash):
-            path.L(p.b.x, p.b.y)
+        xs = self.xs[: self._n]
+        ys = self.ys[: self._n]
+
+        dx, dy, length = self.edges
+        product = length[:-1] * length[1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cos_phi = (dx[:-1] * dx[1:] + dy[:-1] * dy[1:]) / product
+            phi = np.arccos(np.clip(cos_phi, -1.0, 1.0))
+        # zero length edges have no angle
+        phi[product == 0] = math.pi
+        distance = thickness - thickness / np.arange(1, len(phi) + 1)
+        backflash_x = xs[1:-1] + distance * np.cos(phi)
+        backflash_y = ys[1:-1] + distance * np.sin(phi)
+
+        # out along the nodes, back along the backflash
+        _line_to(
+            path,
+            np.concatenate((xs[1:], backflash_x[::-1])),
+            np.concatenate((ys[1:], backflash_y[::-1])),
+        )
 
         path.Z()
         return path
@@ -283,22 +287,32 @@ def random_point(max_x: int, max_y: int) -> Point:
 
 
 def make_flash(width, height, nodes, verbose):
-    flash = Flash(width=width, height=height)
+    flash = Flash(width=width, height=height, nodes_hint=nodes + 1)
     first_flash = flash
     flashes = [flash]
-    for _ in range(nodes):
-        if flash.current_point().within_perimeter(flash.end, height / 20):
+    # draw the randomness of all steps up front, from the seeded global state
+    deflects = np.random.random(nodes)
+    factors = np.random.randint(-1, 2, nodes)
+    lengths = np.random.randint(1, 11, nodes)
+    # restart once the walk comes within height / 20 of its end point
+    r2 = (height / 20) ** 2
+    for i in range(nodes):
+        last = len(flash) - 1
+        dx = flash.xs[last] - flash.end.x
+        dy = flash.ys[last] - flash.end.y
+        if dx * dx + dy * dy < r2:
             flash = Flash(
                 width=width,
                 height=height,
                 start=first_flash.random_node,
                 end=random_point(width, height / 2),
+                nodes_hint=nodes + 1,
             )
             if verbose:
                 click.echo(f"new flash started {flash}")
 
             flashes.append(flash)
-        flash.random_walk()
+        flash.random_walk(lengths[i], deflect=deflects[i], factor=factors[i])
     return flashes
 
 
@@ -307,8 +321,14 @@ def make_flash(width, height, nodes, verbose):
 @click.option("-w", "--width", type=int, default=500)
 @click.option("-h", "--height", type=int, default=500)
 @click.option("-o", "--outfile", default="/tmp/flash.svg")
+@click.option("-s", "--seed", "seed_value", type=int, default=None)
+@click.option("-j", "--jit", is_flag=True, help="compile the walk with numba")
 @click.option("-v", "--verbose", is_flag=True)
-def main(nodes, width, height, outfile, verbose):
+def main(nodes, width, height, outfile, seed_value, jit, verbose):
+    if jit:
+        enable_jit()
+    if seed_value is not None:
+        seed(seed_value)
     drawing = Drawing(width, height, origin=(0, 0))
     flashes = make_flash(width=width, height=height, nodes=nodes, verbose=verbose)
     for flash in flashes:
@@ -0,0 +1,95 @@
+"""
+Points and vectors for the flash paths
+"""
+
+import typing as t
+import math
+
+
+def _polar_delta(phi: float, length: float) -> t.Tuple[float, float]:
+    return length * math.cos(phi), length * math.sin(phi)
+
+
+def angle_between(v1: "Vector", v2: "Vector") -> float:
+    ux, uy = v1.normal_form
+    vx, vy = v2.normal_form
+    try:
+        cos_phi = (ux * vx + uy * vy) / (v1.length * v2.length)
+    except ZeroDivisionError:
+        print("zero length: {0!r} {1!r}".format(v1, v2))
+        return math.pi
+    return math.acos(max(-1.0, min(1.0, cos_phi)))
+
+
+class Point:
+    __slots__ = ("x", "y")
+    x: float
+    y: float
+
+    def __init__(self, x: float = 0.0, y: float = 0.0):
+        self.x = x
+        self.y = y
+
+    def __repr__(self) -> str:
+        return "<{0}, {1}>".format(self.x, self.y)
+
+    def translate(self, x: float, y: float) -> "Point":
+        return Point(self.x + x, self.y + y)
+
+    def within_limits(self, x: float, y: float) -> bool:
+        return 0 <= self.x <= x and 0 <= self.y <= y
+
+    def within_perimeter(self, other: "Point", r: float) -> bool:
+        dx = self.x - other.x
+        dy = self.y - other.y
+        return dx * dx + dy * dy < r * r
+
+
+class Vector:
+    __slots__ = ("a", "b", "_dx", "_dy", "ab", "length")
+    a: Point
+    b: Point
+    _dx: float
+    _dy: float
+    ab: t.Tuple[float, float]
+    length: float
+
+    def __init__(self, a: Point, b: Point):
+        if not isinstance(a, Point):
+            raise TypeError("a must be Point")
+        elif not isinstance(b, Point):
+            raise TypeError("b must be Point")
+        else:
+            # vectors are not changed after creation, derive once
+            self.a = a
+            self.b = b
+            self._dx = b.x - a.x
+            self._dy = b.y - a.y
+            self.ab = (self._dx, self._dy)
+            self.length = math.hypot(self._dx, self._dy)
+
+    def __repr__(self) -> str:
+        return f"<Vector {self.a}, {self.b}>"
+
+    @staticmethod
+    def from_polar(start: Point, phi: float, length: float) -> "Vector":
+        return Vector(start, start.translate(*_polar_delta(phi, length)))
+
+    @property
+    def normal_form(self) -> t.Tuple[float, float]:
+        """
+        B - A, assume 0, 0 origin
+        """
+        return (-self._dx, -self._dy)
+
+    @property
+    def heading(self) -> t.Tuple[float, float]:
+        return self._dx / self.length, self._dy / self.length
+
+    @property
+    def phi(self) -> float:
+        # atan2 is scale invariant, no need to normalize first
+        return math.atan2(self._dx, self._dy)
+
+    def dot(self, v: "Vector") -> float:
+        return self._dx * v._dx + self._dy * v._dy
@@ -58,10 +58,10 @@ def flash(drawing, data, width, height, reflect, opts=None):
     opts = opts or {}
     use_spec = opts.get("use-spec")
     half_width = width / 2
-    flash = Flash(width=width, height=height)
+    nodes = len(data) // 2
+    flash = Flash(width=width, height=height, nodes_hint=nodes + 1)
     first_flash = flash
     flashes = [flash]
-    nodes = len(data) // 2
     energy = rms(data)
     if use_spec:
         spec = spectrum(data, nodes)
@@ -77,7 +77,9 @@ def flash(drawing, data, width, height, reflect, opts=None):
                 if use_spec
                 else Point(end_x, random.randint(0, height))
             )
-            flash = Flash(width=width, height=height, start=start, end=end)
+            flash = Flash(
+                width=width, height=height, start=start, end=end, nodes_hint=nodes + 1
+            )
             flashes.append(flash)
             if use_spec:
                 j += 1